@@ -7,19 +7,19 @@ from model_config import *
 
 # Import package functions
 from model.import_data import load_posterior
-from model.helper_functions import calc_distrib_params
+from model.helper_functions import calc_distrib_params, calc_distrib_params_sides
 
 # Load posterior distributions
 POSTERIOR = load_posterior()
 
-def calc_params(row: pd.Series, style: str, mean_model_flag: bool) -> tuple:
+def calc_params(dataframe: pd.DataFrame, style: str, mean_model_flag: bool) -> tuple:
     """
-    Calculate distribution parameters based on row values.
+    Calculate distribution parameters for all rows in one vectorized call.
 
     Parameters
     ----------
-    row : pd.Series
-        A pandas Series representing a row of a DataFrame.
+    dataframe : pd.DataFrame
+        The input DataFrame containing "magnitude" and "u_star" columns.
     style : str
         Style of faulting.
     mean_model_flag : bool
@@ -29,23 +29,25 @@ def calc_params(row: pd.Series, style: str, mean_model_flag: bool) -> tuple:
     Returns
     -------
     tuple
-        A tuple of the calculated mean, total sigma, and lambda parameter. 
+        A tuple of the calculated mean, total sigma, and lambda parameter as arrays with
+        shape (n_rows, n_runs), where n_runs is 1 for the mean model.
         Not that the mean and sigma are in Box-Cox transform units.
 
     """
 
-    # Define function variable and apply function to each row of dataframe
+    # Define function variable and apply function to all rows at once
     f = calc_distrib_params
     result = f(
-        magnitude=row["magnitude"],
-    location=row["u_star"],
-    style=style,
-    posterior=POSTERIOR,
-    mean_model=mean_model_flag,
+        magnitude=dataframe["magnitude"].to_numpy(dtype=float),
+        location=dataframe["u_star"].to_numpy(dtype=float),
+        style=style,
+        posterior=POSTERIOR,
+        mean_model=mean_model_flag,
+        engine=ENGINE,
     )
-    
-    return tuple(np.squeeze(arr) for arr in result[:3])
-    
+
+    return result[:3]
+
 
 def calc_model_predictions(
     dataframe: pd.DataFrame, style: str, mean_model_flag: bool
@@ -67,31 +69,132 @@ def calc_model_predictions(
     Returns
     -------
     pd.DataFrame
-        The DataFrame containing the input data and model predictions.
+        The DataFrame containing the input data and model predictions in long format,
+        with one row per input row and model run (rows are ordered by input row, then
+        MODEL_ID).
 
     """
 
-    # Calculuate mu, sigma (in transformed units)for each row and number of model runs
-    dataframe = dataframe.copy()
-    mu, sig, bc_param = "mu", "sigma", "lambda"
-    dataframe[[mu, sig, bc_param]] = dataframe.apply(
-        lambda row: pd.Series(calc_params(row, style, mean_model_flag)), axis=1
-    )
+    # Calculuate mu, sigma (in transformed units) for all rows and number of model runs
+    mu, sig, bc_param = calc_params(dataframe, style, mean_model_flag)
+    n_rows, n_runs = mu.shape
+
+    # Repeat each input row once per model run; arrays are flattened in the same order
+    dataframe = dataframe.iloc[np.repeat(np.arange(n_rows), n_runs)].reset_index(drop=True)
+
+    return add_predictions(dataframe, mu, sig, bc_param, mean_model_flag)
+
+
+def add_predictions(
+    dataframe: pd.DataFrame,
+    mu: np.ndarray,
+    sig: np.ndarray,
+    bc_param: np.ndarray,
+    mean_model_flag: bool,
+) -> pd.DataFrame:
+    """
+    Add the model predictions and model run ids and weights to the repeated input rows.
+
+    Parameters
+    ----------
+    dataframe : pd.DataFrame
+        The input rows, repeated once per model run (and side) in the order of the flattened
+        arrays.
+    mu, sig, bc_param : np.ndarray
+        The mean, total sigma, and lambda parameter; the last axis is the model run.
+    mean_model_flag : bool
+        Flag indicating whether to use the mean model (True) or full model with
+        1000 runs (False).
+
+    Returns
+    -------
+    pd.DataFrame
+        The DataFrame with "mu", "sigma", "lambda", "MODEL_ID", and "fdm_wt" columns.
+    """
+
+    n_runs = mu.shape[-1]
+    dataframe["mu"] = mu.ravel()
+    dataframe["sigma"] = sig.ravel()
+    dataframe["lambda"] = bc_param.ravel()
 
     # Additional processing based on number of model runs and weights
     if mean_model_flag:
         dataframe["MODEL_ID"] = 1
         dataframe["fdm_wt"] = 1
     else:
-        # Enumerate MODEL_IDs
-        dataframe["MODEL_ID"] = dataframe[mu].apply(
-            lambda x: list(range(1, len(x) + 1))
-        )
-        # Calcualte weights for each MODEL_ID
-        n_runs = dataframe[mu].apply(lambda x: len(x))
-        dataframe["fdm_wt"] = pd.Series([[1 / i] * i for i in n_runs])
-        dataframe = dataframe.explode(
-            [mu, sig, bc_param, "MODEL_ID", "fdm_wt"], ignore_index=True
-        )
+        # Enumerate MODEL_IDs and calculate equal weights for each MODEL_ID
+        dataframe["MODEL_ID"] = np.tile(np.arange(1, n_runs + 1), mu.size // n_runs)
+        dataframe["fdm_wt"] = 1 / n_runs
+
+    return dataframe
+
+
+def calc_model_predictions_sides(
+    dataframe: pd.DataFrame,
+    style: str,
+    mean_model_flag: bool,
+    sides: tuple = ("left", "right"),
+    samples: np.ndarray = None,
+) -> pd.DataFrame:
+    """
+    Calculate model predictions at "u_star" and at "1 - u_star" in one pass. The magnitude
+    terms of the model are calculated once and shared by both sides.
+
+    Parameters
+    ----------
+    dataframe : pd.DataFrame
+        The input DataFrame containing the data.
+    style : str
+        Style of faulting.
+    mean_model_flag : bool
+        Flag indicating whether to use the mean model (True) or full model with
+        1000 runs (False).
+    sides : tuple, optional
+        Labels for the "u_star" side and the "1 - u_star" side. Default ("left", "right").
+    samples : np.ndarray, optional
+        Indices of the posterior samples to use with the full model, e.g. to add samples in
+        batches. MODEL_ID and fdm_wt are the same as when all samples are used. If None, use
+        all samples. Default None.
+
+    Returns
+    -------
+    pd.DataFrame
+        The model predictions for both sides in long format, with a "side" column (rows are
+        ordered by side, then input row, then MODEL_ID). The "u_star" column holds the
+        location used for each side. Same as concatenating `calc_model_predictions` for each
+        side.
+    """
+
+    # Select a subset of the posterior samples
+    posterior = POSTERIOR
+    subset = samples is not None and not mean_model_flag
+    if subset:
+        key = style.lower()
+        full = POSTERIOR[key]["full"]
+        posterior = {key: {"mean": POSTERIOR[key]["mean"], "full": full.iloc[samples]}}
+
+    # Calculuate mu, sigma (in transformed units) with shape (2, n_rows, n_runs)
+    u_star = dataframe["u_star"].to_numpy(dtype=float)
+    mu, sig, bc_param = calc_distrib_params_sides(
+        magnitude=dataframe["magnitude"].to_numpy(dtype=float),
+        location=u_star,
+        style=style,
+        posterior=posterior,
+        mean_model=mean_model_flag,
+        engine=ENGINE,
+    )
+    n_sides, n_rows, n_runs = mu.shape
+
+    # Repeat each input row once per side and model run; arrays are flattened in the same order
+    rows = np.tile(np.repeat(np.arange(n_rows), n_runs), n_sides)
+    dataframe = dataframe.iloc[rows].reset_index(drop=True)
+    dataframe["u_star"] = np.repeat(np.stack([u_star, 1 - u_star]), n_runs, axis=1).ravel()
+
+    dataframe = add_predictions(dataframe, mu, sig, bc_param, mean_model_flag)
+    if subset:
+        # Keep the ids and weights the samples have in the full posterior
+        dataframe["MODEL_ID"] = np.tile(np.asarray(samples) + 1, n_sides * n_rows)
+        dataframe["fdm_wt"] = 1 / len(full)
+    dataframe["side"] = np.repeat(np.array(sides, dtype=object), n_rows * n_runs)
 
     return dataframe
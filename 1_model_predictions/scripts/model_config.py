@@ -10,12 +10,36 @@ pd.set_option("display.width", 800)
 # Define scripts working directory
 PWD = Path(sys.argv[0]).absolute().parent
 
+# Set repository root directory and add to path for the shared pipeline utilities
+ROOT_DIR = Path(__file__).parents[2]
+sys.path.append(str(ROOT_DIR))
+
 # Set root directory for scenario inputs
 ROOT_INP = Path(__file__).parents[1] / "inputs"
 
 # Set root directory for model prediction outputs
 ROOT_OUT = PWD.parent / "results"
 
+# Set cases and their style of faulting; also used by the runners of the later stages that
+# calculate model predictions
+CASE_STYLES = {
+    "norcia_case1": "Normal",
+    "le_teil_case2": "Reverse",
+    "le_teil_extra": "Reverse",
+    "kumamoto_case3": "Strike-Slip",
+    "kumamoto_case2": "Strike-Slip",
+}
+
+# Set the side labels of the model predictions in the later stages, and the files of the model
+# predictions at each side (see SIDES in model_runner.py)
+# FIXME: left is assumed to be U* and right is assumed to be 1-U*; fix wording
+SIDE_FILES = {"left": "site.csv", "right": "complement.csv"}
+
 # Set directory for model code and add to path
-MODEL_DIR = PWD.parents[1] / "KuehnEtAl2024"
+MODEL_DIR = Path(__file__).parents[2] / "KuehnEtAl2024"
 sys.path.append(str(MODEL_DIR))
+
+# Set how the model is evaluated: "formula" evaluates the model formulas; "table" interpolates
+# precomputed (magnitude, u_star) tables, which is faster for large catalogs, with errors
+# estimated by `model.lookup_tables.table_error_estimate` (below 1e-2 transformed units)
+ENGINE = "formula"
@@ -6,16 +6,14 @@ from pathlib import Path
 from model_config import *
 
 # Import package functions
-from functions import calc_model_predictions
+from functions import calc_model_predictions_sides
+from model.import_data import DIR_DATA, FILENAMES
+from pipeline.cache import UnitCache
+from pipeline.instrument import REPORT, count
+from pipeline.parallel import parse_args, run_units
 
 # Set cases to read and their style of faulting
-CASES = {
-    "kumamoto_case2.csv": "Strike-Slip",
-    "kumamoto_case3.csv": "Strike-Slip",
-    "le_teil_case2.csv": "Reverse",
-    "le_teil_extra.csv": "Reverse",
-    "norcia_case1.csv": "Normal",
-}
+CASES = {f"{c}.csv": sof for c, sof in CASE_STYLES.items()}
 
 # Set implementations of KEA22 model to loop over
 MODELS = {"mean_model": True, "full_model": False}
@@ -23,39 +21,66 @@ MODELS = {"mean_model": True, "full_model": False}
 # Set sides to loop over
 SIDES = ["site", "complement"]
 
+# Set source files that determine the model predictions
+CODE = [
+    Path(__file__),
+    Path(__file__).parent / "functions.py",
+    Path(__file__).parent / "model_config.py",
+    *sorted((MODEL_DIR / "model").glob("*.py")),
+    *sorted((ROOT_DIR / "pipeline").glob("*.py")),
+]
 
-## Loop over cases
-for c, sof in CASES.items():
+
+def run_model_predictions(c: str, sof: str, m: str, flag: bool) -> str:
+    """Calculate and save model predictions for one case and model, at both sides."""
+
+    # Directory set-up
+    dir_outputs = ROOT_OUT / Path(c).stem / m
+    dir_outputs.mkdir(parents=True, exist_ok=True)
 
     # Import case information
     df = pd.read_csv(ROOT_INP / c, low_memory=False)
 
-    # Loop over models
-    for m, flag in MODELS.items():
+    # Use a helper function to calculate mu, sigma and clean up dataframe; both sides are
+    # calculated in one pass, where the complement side uses 1 - u_star
+    df_sides = calc_model_predictions_sides(df, sof, flag, sides=tuple(SIDES))
+    count(rows_in=len(df), rows_out=len(df_sides))
+
+    for s in SIDES:
+        df_results = df_sides[df_sides["side"] == s].drop(columns="side")
+
+        # Add a column for the final row weight
+        df_results["total_wt"] = df_results["ssc_wt"] * df_results["fdm_wt"]
+
+        # Save results
+        fout = f"{s}.csv"
+        df_results.to_csv(dir_outputs / fout, index=False)
+
+    return f"*** Model predictions calculated for for {c} with {m} at {' and '.join(SIDES)} sides."
+
+
+def unit_cache(c: str, sof: str, m: str, flag: bool) -> UnitCache:
+    """Set up the cache record for one case and model."""
 
-        # Directory set-up
-        dir_outputs = ROOT_OUT / Path(c).stem / m
-        dir_outputs.mkdir(parents=True, exist_ok=True)
+    dir_outputs = ROOT_OUT / Path(c).stem / m
+    return UnitCache(
+        dir_outputs / ".predictions.cache.json",
+        inputs=[ROOT_INP / c, DIR_DATA / FILENAMES[sof.lower()]],
+        outputs=[dir_outputs / f"{s}.csv" for s in SIDES],
+        code=CODE,
+    )
 
-        # Loop over sides
-        df2 = df.copy()
 
-        for s in SIDES:
-            if s == "complement":
-                df2["u_star"] = 1 - df2["u_star"]
+def make_units() -> list:
+    """Return the units for all cases and models; sides are calculated together."""
+    return [(c, sof, m, flag) for c, sof in CASES.items() for m, flag in MODELS.items()]
 
-            # Use a helper function to calculate mu, sigma and clean up dataframe
-            df_results = calc_model_predictions(df2, sof, flag)
-            
-            # Add a column for the final row weight
-            df_results["total_wt"] = df_results["ssc_wt"] * df_results["fdm_wt"]
 
-            # Save results
-            fout = f"{s}.csv"
-            df_results.to_csv(dir_outputs / fout, index=False)
+if __name__ == "__main__":
+    args = parse_args("Calculate model predictions for all cases, models, and sides.")
 
-            # Print status
-            print(
-                f"*** Model predictions calculated for for {c} with {m} at {s} side.",
-                flush=True,
-            )
+    ## Loop over cases and models; sides are calculated together
+    units = make_units()
+    caches = [unit_cache(*unit) for unit in units]
+    report = ROOT_OUT / REPORT if args.report else None
+    run_units(run_model_predictions, units, args.jobs, caches, args.force, report)